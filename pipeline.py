@@ -0,0 +1,28 @@
+"""
+Cricbuzz Pipeline - Single-pass crawl
+Discovers recent international matches and scrapes their squads in one
+async run, sharing one aiohttp session and rate limiter across both stages.
+"""
+
+import asyncio
+
+from sports_records import SportsMatchScraper, SportsMatchRecords
+from squads import gather_squads
+
+
+async def run_all():
+    db = SportsMatchRecords()
+    async with SportsMatchScraper() as scraper:
+        matches = await scraper.scrape()
+        # Match rows are saved on a worker thread while squads are fetched
+        saving = asyncio.create_task(asyncio.to_thread(db.save_matches, matches))
+        try:
+            await gather_squads(scraper, [m["match_id"] for m in matches])
+        finally:
+            # Always wait for the save so its errors surface
+            await saving
+            db.display()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_all())
@@ -3,15 +3,44 @@ Sports Match Records - Refined Dynamic Web Scraper
 Fetches international cricket match data from Cricbuzz with deep parsing.
 """
 
-import requests
+import asyncio
+import aiohttp
 from bs4 import BeautifulSoup
+import soupsieve as sv
 import sqlite3
 import re
+import sys
 import time
 from contextlib import contextmanager
 from typing import List, Dict, Optional
 
 
+class RateLimiter:
+    """Async token bucket allowing `rate` requests per `period` seconds"""
+
+    def __init__(self, rate: float, period: float = 1.0):
+        self.rate = rate
+        self.period = period
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.period)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return self
+                # Wait just long enough for the next token
+                await asyncio.sleep((1 - self.tokens) * self.period / self.rate)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
 class SportsMatchScraper:
     """Enhanced scraper for international cricket match data"""
     
@@ -39,28 +68,85 @@ class SportsMatchScraper:
         "IRE": "Ireland", "ITA": "Italy", "SCO": "Scotland", "NED": "Netherlands"
     }
 
+    # Precompiled patterns and selectors, reused for every page
+    _LINK_RE = re.compile(r'href=["\'](?:https?://www\.cricbuzz\.com)?/live-cricket-scores/(\d+)/([^"\'/?#]+)')
+    _RE_WS = re.compile(r"\s+")
+    _RE_RESULT = re.compile(r"won by|Match tied|No result", re.I)
+    _RE_UMPIRES = re.compile(r"^Umpires:?\s*")
+    _RE_TV_UMPIRE = re.compile(r"^3rd Umpire:?\s*")
+    _RE_REFEREE = re.compile(r"^Referee:?\s*")
+    _EXCLUDE_RE = re.compile("|".join(map(re.escape, EXCLUDE_PATTERNS)))
+    _INTL_RE = re.compile("|".join(map(re.escape, INTL_PATTERNS)))
+
+    _SEL_VENUE = sv.compile('a[href*="/venues/"]')
+    _SEL_GROUND = sv.compile('a[href*="/cricket-grounds/"]')
+    _SEL_WINNER = sv.compile('#sticky-mcomplete div div')
+    _SEL_INFO_ROWS = sv.compile(".cb-mtch-info-itm, .facts-row-grid, .cb-col-100.cb-col")
+
+    # Stored when no venue could be found; never added to the venues table
+    UNKNOWN_VENUE = "Unknown"
+
+    # Max in-flight requests to Cricbuzz, and max request rate
+    MAX_CONCURRENCY = 8
+    REQUESTS_PER_SECOND = 5
+
+    # Transient statuses, connection errors and timeouts are retried with
+    # exponential backoff
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    MAX_RETRIES = 3
+
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(self.HEADERS)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        self.limiter = RateLimiter(self.REQUESTS_PER_SECOND)
 
-    def fetch_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Fetch and parse HTML"""
+    async def __aenter__(self):
+        """Open the shared session; other stages can reuse it via fetch_raw"""
+        timeout = aiohttp.ClientTimeout(total=30)
+        connector = aiohttp.TCPConnector(limit=self.MAX_CONCURRENCY)
+        self.session = aiohttp.ClientSession(headers=self.HEADERS, connector=connector, timeout=timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+        return False
+
+    async def fetch_raw(self, url: str) -> Optional[bytes]:
+        """Fetch a page body as raw bytes, retrying transient errors"""
         try:
-            time.sleep(0.5) # Be gentle
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
+            for attempt in range(self.MAX_RETRIES + 1):
+                last_attempt = attempt == self.MAX_RETRIES
+                try:
+                    async with self.semaphore, self.limiter:
+                        async with self.session.get(url) as response:
+                            if response.status not in self.RETRY_STATUSES or last_attempt:
+                                response.raise_for_status()
+                                return await response.read()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if last_attempt:
+                        raise
+                # Back off outside the semaphore so other requests proceed
+                await asyncio.sleep(0.3 * 2 ** attempt)
         except Exception as e:
             print(f"❌ Error fetching {url}: {e}")
             return None
 
+    async def fetch_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Fetch and parse HTML"""
+        body = await self.fetch_raw(url)
+        if body is None: return None
+        # Raw bytes let lxml detect the encoding itself
+        return BeautifulSoup(body, "lxml")
+
     def clean_text(self, text: str) -> str:
         """Clean and shorten extracted text"""
         if not text: return ""
         # Remove extra whitespaces and newlines
-        text = re.sub(r"\s+", " ", text).strip()
-        # Limit length to avoid DB bloat
-        return text[:100]
+        text = self._RE_WS.sub(" ", text).strip()
+        # Limit length to avoid DB bloat; venues/results repeat across
+        # matches, so interning lets duplicates share one object
+        return sys.intern(text[:100])
 
     def extract_teams_from_slug(self, slug: str) -> str:
         parts = slug.upper().split("-")
@@ -71,16 +157,37 @@ class SportsMatchScraper:
             return f"{t1} vs {t2}"
         return "Unknown vs Unknown"
 
-    def get_match_details(self, match_id: str, slug: str, teams: str) -> Dict:
+    def extract_officials(self, soup: BeautifulSoup, details: Dict):
+        """Fill umpire/referee fields in `details` from any info rows on the page"""
+        # Try multiple selectors as Cricbuzz uses different layouts
+        info_rows = self._SEL_INFO_ROWS.select(soup)
+        
+        for row in info_rows:
+            txt = row.get_text(separator=" ", strip=True)
+            if txt.startswith("Umpires"):
+                # Clean label and split names
+                val = self._RE_UMPIRES.sub("", txt).strip()
+                names = [sys.intern(n.strip()) for n in val.split(",") if n.strip()]
+                if len(names) >= 1: details["umpire_1"] = names[0]
+                if len(names) >= 2: details["umpire_2"] = names[1]
+            elif txt.startswith("3rd Umpire"):
+                details["tv_umpire"] = sys.intern(self._RE_TV_UMPIRE.sub("", txt).strip())
+            elif txt.startswith("Referee"):
+                details["match_referee"] = sys.intern(self._RE_REFEREE.sub("", txt).strip())
+
+    async def get_match_details(self, match_id: str, slug: str, teams: str) -> Dict:
         """Visit detail pages for high-fidelity data"""
-        details = {"winner": None, "venue": None, "match_name": None, "format": "Unknown"}
+        details = {
+            "winner": None, "venue": None, "match_name": None, "format": "Unknown",
+            "umpire_1": None, "umpire_2": None, "tv_umpire": None, "match_referee": None
+        }
         team_parts = [t.strip().lower() for t in teams.split(" vs ")]
         
         # 1. Get Venue from Live Score page
         live_url = f"{self.BASE_URL}/live-cricket-scores/{match_id}/{slug}"
-        soup = self.fetch_page(live_url)
+        soup = await self.fetch_page(live_url)
         if soup:
-            venue_el = soup.select_one('a[href*="/venues/"]')
+            venue_el = self._SEL_VENUE.select_one(soup)
             if venue_el:
                 details["venue"] = self.clean_text(venue_el.get_text())
             
@@ -98,77 +205,79 @@ class SportsMatchScraper:
                 elif "ODI" in match_name.upper(): details["format"] = "ODI"
                 elif "TEST" in match_name.upper(): details["format"] = "Test"
             
-            winner_el = soup.select_one('#sticky-mcomplete div div')
+            winner_el = self._SEL_WINNER.select_one(soup)
             if winner_el:
                 txt = self.clean_text(winner_el.get_text())
                 # Validate winner text contains one of the teams
                 if any(team in txt.lower() for team in team_parts):
                     details["winner"] = txt
 
+            self.extract_officials(soup, details)
+
+        # Live page already gave us everything, skip the extra round-trip
+        missing = (
+            not details["venue"] or not details["winner"]
+            or not any(details[k] for k in ("umpire_1", "tv_umpire", "match_referee"))
+        )
+        if not missing:
+            return details
+
         # 2. Match Facts (Venue, Winner fallback, and Officials)
         facts_url = f"{self.BASE_URL}/cricket-match-facts/{match_id}/{slug}"
-        soup = self.fetch_page(facts_url)
+        soup = await self.fetch_page(facts_url)
         if soup:
             if not details["venue"]:
-                venue_el = soup.select_one('a[href*="/venues/"]') or soup.select_one('a[href*="/cricket-grounds/"]')
+                venue_el = self._SEL_VENUE.select_one(soup) or self._SEL_GROUND.select_one(soup)
                 if venue_el:
                     details["venue"] = self.clean_text(venue_el.get_text())
             
             if not details["winner"]:
-                candidate = soup.find(string=re.compile(r"won by|Match tied|No result", re.I))
+                candidate = soup.find(string=self._RE_RESULT)
                 if candidate:
                     res_text = self.clean_text(candidate.parent.get_text())
                     if any(team in res_text.lower() for team in team_parts):
                         details["winner"] = res_text
 
-            # --- Extract Officials ---
-            details.update({"umpire_1": None, "umpire_2": None, "tv_umpire": None, "match_referee": None})
-            # Try multiple selectors as Cricbuzz uses different layouts
-            info_rows = soup.select(".cb-mtch-info-itm, .facts-row-grid, .cb-col-100.cb-col")
-            
-            for row in info_rows:
-                txt = row.get_text(separator=" ", strip=True)
-                if txt.startswith("Umpires"):
-                    # Clean label and split names
-                    val = re.sub(r"^Umpires:?\s*", "", txt).strip()
-                    names = [n.strip() for n in val.split(",") if n.strip()]
-                    if len(names) >= 1: details["umpire_1"] = names[0]
-                    if len(names) >= 2: details["umpire_2"] = names[1]
-                elif txt.startswith("3rd Umpire"):
-                    details["tv_umpire"] = re.sub(r"^3rd Umpire:?\s*", "", txt).strip()
-                elif txt.startswith("Referee"):
-                    details["match_referee"] = re.sub(r"^Referee:?\s*", "", txt).strip()
+            self.extract_officials(soup, details)
 
         return details
 
-    def scrape(self) -> List[Dict]:
+    async def scrape(self) -> List[Dict]:
+        if self.session is None:
+            # Standalone use: open a session just for this scrape
+            async with self:
+                return await self.scrape()
+
         print("🔍 Scanning recent international matches...")
-        soup = self.fetch_page(self.RECENT_MATCHES_URL)
-        if not soup: return []
+        body = await self.fetch_raw(self.RECENT_MATCHES_URL)
+        if not body: return []
 
-        matches = []
-        seen_ids = set()
-        
-        links = soup.find_all("a", href=re.compile(r"/live-cricket-scores/\d+/"))
-        for link in links:
-            href = link.get("href", "")
-            match_id_match = re.search(r"/(\d+)/", href)
-            if not match_id_match: continue
-            match_id = match_id_match.group(1)
-            
-            if match_id in seen_ids: continue
-            
+        # Match links are pulled straight from the HTML, first slug per ID wins
+        links = {}
+        for match_id, slug in self._LINK_RE.findall(body.decode("utf-8", "replace")):
+            links.setdefault(match_id, slug)
+
+        candidates = []
+        for match_id, slug in links.items():
             # Filtering Logic
-            url_lower = href.lower()
-            if any(p in url_lower for p in self.EXCLUDE_PATTERNS): continue
-            if not any(p in url_lower for p in self.INTL_PATTERNS): continue
+            url_lower = slug.lower()
+            if self._EXCLUDE_RE.search(url_lower): continue
+            if not self._INTL_RE.search(url_lower): continue
             
-            seen_ids.add(match_id)
-            slug = href.split("/")[-1]
             teams = self.extract_teams_from_slug(slug)
             
             print(f"📊 Processing ID {match_id}: {teams}...")
-            details = self.get_match_details(match_id, slug, teams)
+            candidates.append((match_id, slug, teams))
+
+        # Fetch detail pages for all candidates concurrently
+        tasks = [self.get_match_details(match_id, slug, teams) for match_id, slug, teams in candidates]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        matches = []
+        for (match_id, slug, teams), details in zip(candidates, results):
+            if isinstance(details, Exception):
+                print(f"❌ Error processing {match_id}: {details}")
+                continue
             
             # Final check to filter placeholders/upcoming
             if not details["winner"]:
@@ -181,7 +290,7 @@ class SportsMatchScraper:
                 "match_name": details["match_name"] or teams,
                 "format": details["format"],
                 "winner": details["winner"],
-                "venue": details["venue"] or "Unknown",
+                "venue": details["venue"] or self.UNKNOWN_VENUE,
                 "officials": {
                     "umpire_1": details.get("umpire_1"),
                     "umpire_2": details.get("umpire_2"),
@@ -202,6 +311,8 @@ class SportsMatchRecords:
     def _get_conn(self):
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
         try:
             yield conn
             conn.commit()
@@ -220,10 +331,34 @@ class SportsMatchRecords:
                     match_name TEXT,
                     format TEXT,
                     winner TEXT,
-                    venue TEXT
+                    venue TEXT,
+                    venue_id INTEGER REFERENCES venues(venue_id)
                 )
             """)
             
+            # Venue names repeat across matches; stored once and referenced by id
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS venues (
+                    venue_id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                )
+            """)
+            
+            # Migrate older sports_match_records tables in place
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(sports_match_records)")}
+            if "venue_id" not in columns:
+                conn.execute("ALTER TABLE sports_match_records ADD COLUMN venue_id INTEGER REFERENCES venues(venue_id)")
+                # Backfill venue ids for rows stored before the column existed
+                conn.execute("""
+                    INSERT OR IGNORE INTO venues (name)
+                    SELECT DISTINCT venue FROM sports_match_records
+                    WHERE venue IS NOT NULL AND venue != ?
+                """, (SportsMatchScraper.UNKNOWN_VENUE,))
+                conn.execute("""
+                    UPDATE sports_match_records
+                    SET venue_id = (SELECT venue_id FROM venues WHERE name = sports_match_records.venue)
+                """)
+            
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS match_officials (
                     match_id INTEGER PRIMARY KEY,
@@ -235,24 +370,43 @@ class SportsMatchRecords:
                 )
             """)
 
+    def _known_venue(self, venue: Optional[str]) -> Optional[str]:
+        return None if venue == SportsMatchScraper.UNKNOWN_VENUE else venue
+
     def save_matches(self, matches: List[Dict]):
+        matches_params = [
+            (m['match_id'], m['teams'], m['match_name'], m['format'], m['winner'], m['venue'],
+             self._known_venue(m['venue']))
+            for m in matches
+        ]
+        # The placeholder venue gets a NULL venue_id rather than a venues row
+        venues_params = [(v,) for v in {self._known_venue(m['venue']) for m in matches} if v]
+        officials_params = [
+            (m['match_id'], m['officials']['umpire_1'], m['officials']['umpire_2'],
+             m['officials']['tv_umpire'], m['officials']['match_referee'])
+            for m in matches
+        ]
+        
         with self._get_conn() as conn:
-            conn.execute("DELETE FROM sports_match_records")
-            conn.execute("DELETE FROM match_officials")
+            conn.executemany("INSERT OR IGNORE INTO venues (name) VALUES (?)", venues_params)
             
-            for m in matches:
-                # Store match metadata
-                conn.execute("""
-                    INSERT INTO sports_match_records (match_id, teams, match_name, format, winner, venue)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (m['match_id'], m['teams'], m['match_name'], m['format'], m['winner'], m['venue']))
-                
-                # Store officials
-                off = m['officials']
-                conn.execute("""
-                    INSERT INTO match_officials (match_id, umpire_1, umpire_2, tv_umpire, match_referee)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (m['match_id'], off['umpire_1'], off['umpire_2'], off['tv_umpire'], off['match_referee']))
+            # Store match metadata, updating rows seen in earlier runs
+            conn.executemany("""
+                INSERT INTO sports_match_records (match_id, teams, match_name, format, winner, venue, venue_id)
+                VALUES (?, ?, ?, ?, ?, ?, (SELECT venue_id FROM venues WHERE name = ?))
+                ON CONFLICT(match_id) DO UPDATE SET
+                    teams=excluded.teams, match_name=excluded.match_name, format=excluded.format,
+                    winner=excluded.winner, venue=excluded.venue, venue_id=excluded.venue_id
+            """, matches_params)
+            
+            # Store officials
+            conn.executemany("""
+                INSERT INTO match_officials (match_id, umpire_1, umpire_2, tv_umpire, match_referee)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(match_id) DO UPDATE SET
+                    umpire_1=excluded.umpire_1, umpire_2=excluded.umpire_2,
+                    tv_umpire=excluded.tv_umpire, match_referee=excluded.match_referee
+            """, officials_params)
 
     def display(self):
         with self._get_conn() as conn:
@@ -267,7 +421,7 @@ class SportsMatchRecords:
 
 if __name__ == "__main__":
     scraper = SportsMatchScraper()
-    data = scraper.scrape()
+    data = asyncio.run(scraper.scrape())
     
     db = SportsMatchRecords()
     db.save_matches(data)
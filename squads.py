@@ -1,18 +1,36 @@
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+from bs4 import BeautifulSoup, SoupStrainer
+import queue
 import sqlite3
+import threading
 import time
 import re
-
-# List of matches provided by the user
-MATCH_IDS = [
-    116441, 121389, 121400, 121406, 133000, 133011, 133017, 
-    137826, 137831, 140537, 140548, 140559
-]
+from sports_records import SportsMatchScraper
 
 DB_PATH = "cricbuzz.db"
 
+BASE_URL = SportsMatchScraper.BASE_URL
+
+_RE_PROFILE_LINK = re.compile(r"/profiles/")
+_RE_PROFILE_ID = re.compile(r"/profiles/(\d+)/")
+
+# Map of profile field labels to keys in the profile dict
+PROFILE_FIELDS = {
+    "Born": "birth_date",
+    "Birth Place": "birth_place",
+    "Nickname": "nickname",
+    "Height": "height",
+    "Batting Style": "batting_style",
+    "Bowling Style": "bowling_style"
+}
+_RE_PROFILE_LABEL = re.compile(r"^\s*(" + "|".join(map(re.escape, PROFILE_FIELDS)) + r")\s*$")
+
+# Only build the parts of each page we read; skips <head> and the large
+# top-level <script> payloads
+PROFILE_STRAINER = SoupStrainer("div")
+SQUAD_STRAINER = SoupStrainer(["title", "div"])
+
 # Known Roles to check for suffix
 # Longer matches first
 KNOWN_ROLES = [
@@ -28,15 +46,55 @@ KNOWN_ROLES = [
     "Bowling Coach",
     "Coach"
 ]
+KNOWN_ROLES_SORTED = sorted(KNOWN_ROLES, key=len, reverse=True)
+_ROLE_RE = re.compile(r"\s*(" + "|".join(map(re.escape, KNOWN_ROLES_SORTED)) + r")$")
+
+# Statements are kept as constants so sqlite3's statement cache reuses them
+# Every squad appearance stores the player's latest name/role
+UPSERT_PLAYER_SQL = """
+    INSERT INTO players (player_id, name, role) VALUES (?, ?, ?)
+    ON CONFLICT(player_id) DO UPDATE SET name = excluded.name, role = excluded.role
+"""
+# Profile fields are only written once a profile page was fetched
+SAVE_PROFILE_SQL = """
+    INSERT INTO players (
+        player_id, name, role, 
+        birth_date, birth_place, nickname, 
+        height, batting_style, bowling_style, profile_fetched
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT(player_id) DO UPDATE SET
+        birth_date = excluded.birth_date, birth_place = excluded.birth_place,
+        nickname = excluded.nickname, height = excluded.height,
+        batting_style = excluded.batting_style, bowling_style = excluded.bowling_style,
+        profile_fetched = 1
+"""
+INSERT_SQUAD_SQL = """
+    INSERT OR IGNORE INTO match_squads (match_id, player_id, team)
+    VALUES (?, ?, ?)
+"""
+
+# Background writer flushes queued rows every WRITE_BATCH_SIZE rows or
+# WRITE_INTERVAL seconds, whichever comes first
+WRITE_BATCH_SIZE = 200
+WRITE_INTERVAL = 0.5
+_STOP = object()
+
+# Optional players columns, added to existing tables if missing
+PLAYER_COLUMNS = {
+    "role": "TEXT",
+    "birth_date": "TEXT",
+    "birth_place": "TEXT",
+    "nickname": "TEXT",
+    "height": "TEXT",
+    "batting_style": "TEXT",
+    "bowling_style": "TEXT",
+    "profile_fetched": "INTEGER NOT NULL DEFAULT 0"
+}
 
 def init_db():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # Drop to schema change
-    cursor.execute("DROP TABLE IF EXISTS players")
-    cursor.execute("DROP TABLE IF EXISTS match_squads")
-    
     # Create Players Table with extended personal info
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS players (
@@ -48,14 +106,27 @@ def init_db():
         nickname TEXT,
         height TEXT,
         batting_style TEXT,
-        bowling_style TEXT
+        bowling_style TEXT,
+        profile_fetched INTEGER NOT NULL DEFAULT 0
     )
     """)
     
+    # Migrate older players tables in place
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(players)")}
+    for column, col_type in PLAYER_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE players ADD COLUMN {column} {col_type}")
+    if "profile_fetched" not in existing:
+        # Rows from older runs count as fetched if any profile field is set
+        cursor.execute("""
+            UPDATE players SET profile_fetched = 1
+            WHERE COALESCE(birth_date, birth_place, nickname, height, batting_style, bowling_style) IS NOT NULL
+        """)
+    
     # Create Match Squads Table
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS match_squads (
-        squad_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        squad_id INTEGER PRIMARY KEY,
         match_id INTEGER NOT NULL,
         player_id INTEGER NOT NULL,
         team TEXT NOT NULL,
@@ -64,6 +135,13 @@ def init_db():
     )
     """)
     
+    # One row per player per team per match; also serves lookups by match_id
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_match_squads_unique
+    ON match_squads (match_id, player_id, team)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_squads_player ON match_squads (player_id)")
+    
     conn.commit()
     conn.close()
 
@@ -92,28 +170,19 @@ def parse_name_role(full_text):
     """
     full_text = full_text.strip()
     
-    # Check for roles at the end of the string
-    found_role = None
-    name_part = full_text
-    
-    for role in KNOWN_ROLES:
-        # Check if text ends with this role
-        # Case insensitive check? Or exact? 
-        # The text usually matches case e.g. "Batter"
-        if full_text.endswith(role):
-            found_role = role
-            # Remove role from end
-            name_part = full_text[:-len(role)].strip()
-            break
-            
-    return name_part, found_role
+    # Single regex search for any known role at the end of the string
+    m = _ROLE_RE.search(full_text)
+    if m:
+        return full_text[:m.start()].strip(), m.group(1)
+    return full_text, None
 
-def fetch_player_profile(player_id, headers):
+async def fetch_player_profile(scraper, player_id):
     """
     Fetches a player's profile page and extracts personal info.
-    Returns a dict with: birth_date, birth_place, nickname, height, batting_style, bowling_style
+    Returns a dict with: birth_date, birth_place, nickname, height, batting_style, bowling_style,
+    or None if the profile could not be fetched (left unfetched and retried next run).
     """
-    profile_url = f"https://www.cricbuzz.com/profiles/{player_id}/player"
+    profile_url = f"{BASE_URL}/profiles/{player_id}/player"
     
     profile_info = {
         "birth_date": None,
@@ -124,165 +193,255 @@ def fetch_player_profile(player_id, headers):
         "bowling_style": None
     }
     
+    body = await scraper.fetch_raw(profile_url)
+    if body is None:
+        print(f"     ⚠️ Could not fetch profile for player {player_id}")
+        return None
+    
     try:
-        r = requests.get(profile_url, headers=headers)
-        if r.status_code != 200:
-            print(f"     ⚠️ Could not fetch profile for player {player_id}")
-            return profile_info
-        
-        soup = BeautifulSoup(r.text, "html.parser")
-        
-        # Find all divs that could contain personal info
-        # The structure is typically: label div followed by value div
-        # Labels include: Born, Birth Place, Nickname, Height, Role, Batting Style, Bowling Style
-        
-        # Map of field labels to keys in our dict
-        field_mapping = {
-            "Born": "birth_date",
-            "Birth Place": "birth_place",
-            "Nickname": "nickname",
-            "Height": "height",
-            "Batting Style": "batting_style",
-            "Bowling Style": "bowling_style"
-        }
+        soup = BeautifulSoup(body, "lxml", parse_only=PROFILE_STRAINER)
         
-        # Find all text on page and look for label patterns
-        all_divs = soup.find_all("div")
-        
-        for div in all_divs:
-            text = div.get_text(strip=True)
-            
-            # Check if this div contains exactly one of our labels
-            for label, key in field_mapping.items():
-                if text == label:
-                    # The value is typically in a sibling div
-                    parent = div.parent
-                    if parent:
-                        children = parent.find_all("div", recursive=False)
-                        for i, child in enumerate(children):
-                            if child.get_text(strip=True) == label and i + 1 < len(children):
-                                value = children[i + 1].get_text(strip=True)
-                                if value and value != label:
-                                    profile_info[key] = value
-                                    break
-                        # Also check if value is in next sibling
-                        if not profile_info[key] and div.next_sibling:
-                            next_el = div.find_next_sibling("div")
-                            if next_el:
-                                value = next_el.get_text(strip=True)
-                                if value and value not in field_mapping.keys():
-                                    profile_info[key] = value
-                    break
+        # The structure is typically: label div followed by value div.
+        # Only divs whose text is exactly one of our labels are visited.
+        for label_el in soup.find_all("div", string=_RE_PROFILE_LABEL):
+            key = PROFILE_FIELDS[label_el.string.strip()]
+            if profile_info[key]:
+                continue
+            value_el = label_el.find_next_sibling("div")
+            if value_el:
+                value = value_el.get_text(strip=True)
+                if value and value not in PROFILE_FIELDS:
+                    profile_info[key] = value
         
     except Exception as e:
-        print(f"     ⚠️ Error fetching profile for player {player_id}: {e}")
+        print(f"     ⚠️ Error parsing profile for player {player_id}: {e}")
+        return None
     
     return profile_info
 
-def scrape_squads():
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    }
+async def fetch_squad(scraper, match_id):
+    """
+    Fetches a match squad page.
+    Returns a list of (team, player_id, name, role) for the playing XI of both sides.
+    """
+    url = f"{BASE_URL}/cricket-match-squads/{match_id}/squads"
     
-    for match_id in MATCH_IDS:
-        print(f"Processing Match ID: {match_id}...")
+    body = await scraper.fetch_raw(url)
+    if body is None:
+        return []
         
-        url = f"https://www.cricbuzz.com/cricket-match-squads/{match_id}/squads"
+    soup = BeautifulSoup(body, "lxml", parse_only=SQUAD_STRAINER)
+    
+    title = soup.title.string if soup.title else ""
+    t1_name, t2_name = extract_teams_from_title(title)
+    
+    # Clean names just in case
+    t1_name = t1_name.replace("Cricket match squads | ", "")
+    t2_name = t2_name.replace("Cricket match squads | ", "")
+    
+    cols = soup.find_all("div", class_="w-1/2")
+    
+    if len(cols) < 2:
+        return []
+    
+    entries = []
+    
+    def process_col(col, team_name):
+        links = col.find_all("a", href=_RE_PROFILE_LINK)
         
-        try:
-            r = requests.get(url, headers=headers)
-            if r.status_code != 200:
-                print(f"❌ Failed to fetch page. Status: {r.status_code}")
-                continue
-                
-            soup = BeautifulSoup(r.text, "html.parser")
-            
-            title = soup.title.string if soup.title else ""
-            t1_name, t2_name = extract_teams_from_title(title)
+        for i, link in enumerate(links):
+            if i >= 11: break
             
-            # Clean names just in case
-            t1_name = t1_name.replace("Cricket match squads | ", "")
-            t2_name = t2_name.replace("Cricket match squads | ", "")
+            href = link['href']
+            full_text = link.get_text().strip()
             
-            cols = soup.find_all("div", class_="w-1/2")
+            name, role = parse_name_role(full_text)
             
-            if len(cols) < 2:
-                continue
+            # Debug print occasionally
+            if i == 0:
+                print(f"   Sample: '{full_text}' -> Name: '{name}', Role: '{role}'")
             
-            def process_col(col, team_name):
-                count = 0
-                links = col.find_all("a", href=re.compile(r"/profiles/"))
-                
-                for i, link in enumerate(links):
-                    if i >= 11: break
-                    
-                    href = link['href']
-                    full_text = link.get_text().strip()
-                    
-                    name, role = parse_name_role(full_text)
-                    
-                    # Debug print occasionally
-                    if i == 0:
-                        print(f"   Sample: '{full_text}' -> Name: '{name}', Role: '{role}'")
-                    
-                    m = re.search(r"/profiles/(\d+)/", href)
-                    if m:
-                        p_id = int(m.group(1))
-                        
-                        # Check if player already exists in database
-                        cursor.execute("SELECT player_id FROM players WHERE player_id = ?", (p_id,))
-                        existing = cursor.fetchone()
-                        
-                        if not existing:
-                            # New player - fetch profile details
-                            print(f"     📥 Fetching profile for {name} (ID: {p_id})...")
-                            profile = fetch_player_profile(p_id, headers)
-                            time.sleep(0.5)  # Rate limiting for profile fetches
-                            
-                            # Insert Player with full profile info
-                            cursor.execute("""
-                                INSERT INTO players (
-                                    player_id, name, role, 
-                                    birth_date, birth_place, nickname, 
-                                    height, batting_style, bowling_style
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                p_id, name, role,
-                                profile["birth_date"], profile["birth_place"], profile["nickname"],
-                                profile["height"], profile["batting_style"], profile["bowling_style"]
-                            ))
-                        else:
-                            # Player exists - just update name and role if needed
-                            cursor.execute("""
-                                UPDATE players SET name = ?, role = ?
-                                WHERE player_id = ?
-                            """, (name, role, p_id))
-                        
-                        # Insert Squad
-                        cursor.execute("""
-                            INSERT OR IGNORE INTO match_squads (match_id, player_id, team)
-                            VALUES (?, ?, ?)
-                        """, (match_id, p_id, team_name))
-                        count += 1
-                return count
+            m = _RE_PROFILE_ID.search(href)
+            if m:
+                entries.append((team_name, int(m.group(1)), name, role))
 
-            process_col(cols[0], t1_name)
-            process_col(cols[1], t2_name)
-            
-            print(f"   ✅ Processed {t1_name} & {t2_name}")
-            
-            conn.commit()
-            time.sleep(1.0)
+    process_col(cols[0], t1_name)
+    process_col(cols[1], t2_name)
+    
+    print(f"   ✅ Processed {match_id}: {t1_name} & {t2_name}")
+    return entries
+
+def load_match_ids():
+    """Match IDs discovered by sports_records.py; gather_squads skips those already scraped"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return [row[0] for row in conn.execute("SELECT match_id FROM sports_match_records ORDER BY match_id")]
+    except sqlite3.OperationalError:
+        print("❌ No sports_match_records table, run sports_records.py first")
+        return []
+    finally:
+        conn.close()
+
+def load_squad_state(match_ids):
+    """
+    Returns (player IDs with a fetched profile, {player_id: (name, role)} for
+    players still missing one, match IDs still to scrape).
+    Matches whose squads were stored by an earlier run are skipped.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        fetched = set()
+        unfetched = {}
+        for p_id, name, role, done in conn.execute("SELECT player_id, name, role, profile_fetched FROM players"):
+            if done:
+                fetched.add(p_id)
+            else:
+                unfetched[p_id] = (name, role)
+        scraped = {row[0] for row in conn.execute("SELECT DISTINCT match_id FROM match_squads")}
+    finally:
+        conn.close()
+    return fetched, unfetched, [mid for mid in match_ids if mid not in scraped]
+
+class DBWriter(threading.Thread):
+    """
+    Owns a SQLite connection on a background thread so commits overlap with
+    network I/O instead of blocking the event loop. Rows queued with put()
+    are written with one executemany per statement.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.queue = queue.Queue()
+        self.error = None
+
+    def put(self, sql, params):
+        # Surface a failed flush right away instead of at close()
+        if self.error:
+            raise self.error
+        self.queue.put((sql, params))
+
+    def close(self):
+        """Flushes remaining rows and waits for the thread to finish"""
+        self.queue.put(_STOP)
+        self.join()
+        if self.error:
+            raise self.error
+
+    def run(self):
+        conn = None
+        batch = {}
+        size = 0
+        last_flush = time.monotonic()
+        try:
+            # Autocommit mode with explicit BEGIN/COMMIT; a larger statement cache
+            # keeps the compiled INSERT/UPDATE plans around
+            conn = sqlite3.connect(self.db_path, cached_statements=256, isolation_level=None)
+            # Trade per-commit fsyncs for a WAL journal
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
             
+            while True:
+                try:
+                    item = self.queue.get(timeout=WRITE_INTERVAL)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    sql, params = item
+                    batch.setdefault(sql, []).append(params)
+                    size += 1
+                if size >= WRITE_BATCH_SIZE or (size and time.monotonic() - last_flush >= WRITE_INTERVAL):
+                    self._flush(conn, batch)
+                    batch = {}
+                    size = 0
+                    last_flush = time.monotonic()
+            self._flush(conn, batch)
+        except Exception as e:
+            # put() and close() re-raise this on the caller's side
+            self.error = e
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _flush(self, conn, batch):
+        if not batch:
+            return
+        conn.execute("BEGIN")
+        try:
+            for sql, rows in batch.items():
+                conn.executemany(sql, rows)
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+
+async def gather_squads(scraper, match_ids):
+    """
+    Scrapes squads and new player profiles for `match_ids`, reusing the
+    scraper's open session and rate limiter. Rows are written by a DBWriter
+    as soon as each page is parsed.
+    """
+    # Blocking SQLite setup runs off the event loop
+    await asyncio.to_thread(init_db)
+    fetched, players, match_ids = await asyncio.to_thread(load_squad_state, match_ids)
+    
+    writer = DBWriter(DB_PATH)
+    writer.start()
+    
+    # Players whose profile is still missing, mapped to their latest name/role
+    profile_tasks = {}
+    
+    async def process_profile(p_id):
+        profile = await fetch_player_profile(scraper, p_id)
+        if profile is None:
+            # Player row stays with profile_fetched = 0 and is retried next run
+            return
+        name, role = players[p_id]
+        writer.put(SAVE_PROFILE_SQL, (
+            p_id, name, role,
+            profile["birth_date"], profile["birth_place"], profile["nickname"],
+            profile["height"], profile["batting_style"], profile["bowling_style"]
+        ))
+    
+    def queue_profile(p_id):
+        if p_id not in fetched and p_id not in profile_tasks:
+            profile_tasks[p_id] = asyncio.create_task(process_profile(p_id))
+    
+    # Retry profiles that failed in earlier runs
+    for p_id in list(players):
+        queue_profile(p_id)
+    
+    async def process_match(match_id):
+        try:
+            entries = await fetch_squad(scraper, match_id)
         except Exception as e:
             print(f"❌ Error processing {match_id}: {e}")
+            return
+        for team_name, p_id, name, role in entries:
+            players[p_id] = (name, role)
+            writer.put(UPSERT_PLAYER_SQL, (p_id, name, role))
+            writer.put(INSERT_SQUAD_SQL, (match_id, p_id, team_name))
+            # Profile fetch starts right away, while other squads load
+            queue_profile(p_id)
+    
+    try:
+        print(f"Processing {len(match_ids)} squads...")
+        await asyncio.gather(*(process_match(mid) for mid in match_ids))
+        print(f"📥 Fetching {len(profile_tasks)} player profiles...")
+        await asyncio.gather(*profile_tasks.values())
+    finally:
+        await asyncio.to_thread(writer.close)
 
-    conn.close()
     print("Done.")
 
+async def _scrape_squads():
+    async with SportsMatchScraper() as scraper:
+        await gather_squads(scraper, load_match_ids())
+
+def scrape_squads():
+    asyncio.run(_scrape_squads())
+
 if __name__ == "__main__":
     scrape_squads()